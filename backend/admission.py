@@ -0,0 +1,190 @@
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from . import auth
+
+# Admission control for expensive endpoints: a token bucket per client (user when the
+# bearer token is valid, IP otherwise) and a concurrency cap per route. Requests over
+# capacity are shed with 429 + Retry-After before they reach bcrypt or the database.
+#
+# Per-IP keys use request.client.host. Behind a reverse proxy run uvicorn with
+# --proxy-headers and --forwarded-allow-ips=<proxy ip> (forwarded_allow_ips), otherwise
+# every client shares the proxy's address and bucket.
+
+ADMISSION_CONTROL_ENABLED = os.getenv("CRM_ADMISSION_CONTROL", "1") == "1"
+
+@dataclass(frozen=True)
+class RouteLimit:
+    rate_per_minute: float  # sustained requests per client
+    burst: int  # bucket size per client
+    max_concurrent: int  # in-flight requests for the route, all clients
+    per_user: bool = True  # key by user when authenticated, otherwise always by IP
+
+def _limit_from_env(name: str, default: RouteLimit) -> RouteLimit:
+    # "<rate_per_minute>,<burst>,<max_concurrent>", e.g. CRM_LIMIT_TOKEN=60,30,4
+    value = os.getenv(name)
+    if not value:
+        return default
+    try:
+        rate, burst, max_concurrent = value.split(",")
+        return RouteLimit(float(rate), int(burst), int(max_concurrent), default.per_user)
+    except ValueError:
+        raise ValueError(
+            "%s=%r is invalid, expected 'rate_per_minute,burst,max_concurrent' (e.g. 60,30,4)"
+            % (name, value)
+        ) from None
+
+# Login and signup are keyed by IP, so the defaults leave room for an office behind
+# one NAT address; the concurrency cap is what protects the workers from bcrypt.
+DEFAULT_LIMITS: Dict[Tuple[str, str], RouteLimit] = {
+    ("POST", "/token"): _limit_from_env(
+        "CRM_LIMIT_TOKEN", RouteLimit(rate_per_minute=60, burst=30, max_concurrent=4, per_user=False)),
+    ("POST", "/users/"): _limit_from_env(
+        "CRM_LIMIT_USERS", RouteLimit(rate_per_minute=20, burst=10, max_concurrent=2, per_user=False)),
+    ("GET", "/opportunities/"): _limit_from_env(
+        "CRM_LIMIT_OPPORTUNITIES", RouteLimit(rate_per_minute=60, burst=20, max_concurrent=8)),
+}
+
+class InMemoryBackend:
+    """Process-local limiter state. Swap for a shared backend (e.g. Redis) exposing the
+    same take/acquire/release/in_flight methods to enforce limits across workers."""
+
+    max_buckets = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> (tokens, last update, time the bucket is full again), least recently used first
+        self._buckets = OrderedDict()
+        self._in_flight = {}  # key -> count
+
+    def take(self, key: str, rate_per_second: float, burst: int) -> float:
+        """Consume one token. Returns 0 when admitted, else seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            tokens, last = (float(burst), now) if bucket is None else bucket[:2]
+            tokens = min(float(burst), tokens + (now - last) * rate_per_second)
+            if tokens >= 1:
+                tokens -= 1
+                retry_after = 0.0
+            else:
+                retry_after = (1 - tokens) / rate_per_second
+            full_at = now + (burst - tokens) / rate_per_second
+            self._buckets[key] = (tokens, now, full_at)
+            self._evict(now)
+            return retry_after
+
+    def _evict(self, now: float):
+        # Amortized O(1): each bucket is evicted at most once. Idle buckets that have
+        # refilled completely carry no state; past the cap, drop the least recently used.
+        while self._buckets:
+            key, (_, _, full_at) = next(iter(self._buckets.items()))
+            if full_at > now and len(self._buckets) <= self.max_buckets:
+                break
+            del self._buckets[key]
+
+    def acquire(self, key: str, limit: int) -> bool:
+        with self._lock:
+            count = self._in_flight.get(key, 0)
+            if count >= limit:
+                return False
+            self._in_flight[key] = count + 1
+            return True
+
+    def release(self, key: str):
+        with self._lock:
+            self._in_flight[key] = max(0, self._in_flight.get(key, 0) - 1)
+
+    def in_flight(self, key: str) -> int:
+        return self._in_flight.get(key, 0)
+
+class AdmissionControl:
+    """Limits, limiter backend and counters shared by the middleware and the metrics route."""
+
+    def __init__(self, limits: Optional[Dict[Tuple[str, str], RouteLimit]] = None, backend=None):
+        self.limits = DEFAULT_LIMITS if limits is None else limits
+        self.backend = backend or InMemoryBackend()
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            route: {"admitted": 0, "shed_rate": 0, "shed_concurrency": 0}
+            for route in self.limits
+        }
+
+    def count(self, route, outcome):
+        with self._stats_lock:
+            self.stats[route][outcome] += 1
+
+    def metrics(self):
+        with self._stats_lock:
+            stats = {route: dict(counts) for route, counts in self.stats.items()}
+        return [
+            {
+                "method": method,
+                "path": path,
+                "rate_per_minute": limit.rate_per_minute,
+                "burst": limit.burst,
+                "max_concurrent": limit.max_concurrent,
+                "in_flight": self.backend.in_flight("concurrency:%s %s" % (method, path)),
+                **stats[(method, path)],
+            }
+            for (method, path), limit in self.limits.items()
+        ]
+
+class AdmissionControlMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, control: AdmissionControl):
+        super().__init__(app)
+        self.control = control
+
+    def _client_key(self, request: Request, limit: RouteLimit) -> str:
+        if limit.per_user:
+            authorization = request.headers.get("authorization", "")
+            scheme, _, token = authorization.partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    return "user:" + auth.decode_token(token)["sub"]
+                except HTTPException:
+                    pass
+        return "ip:" + (request.client.host if request.client else "unknown")
+
+    def _reject(self, retry_after: float, detail: str):
+        return JSONResponse(
+            status_code=429,
+            content={"detail": detail},
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    async def dispatch(self, request: Request, call_next):
+        route = (request.method, request.url.path)
+        limit = self.control.limits.get(route)
+        if limit is None:
+            return await call_next(request)
+
+        backend = self.control.backend
+        route_key = "%s %s" % route
+        client_key = self._client_key(request, limit)
+        retry_after = backend.take(
+            "rate:%s:%s" % (route_key, client_key), limit.rate_per_minute / 60.0, limit.burst
+        )
+        if retry_after > 0:
+            self.control.count(route, "shed_rate")
+            return self._reject(retry_after, "Too many requests, slow down.")
+
+        concurrency_key = "concurrency:" + route_key
+        if not backend.acquire(concurrency_key, limit.max_concurrent):
+            self.control.count(route, "shed_concurrency")
+            return self._reject(1, "Server busy, try again shortly.")
+        try:
+            self.control.count(route, "admitted")
+            return await call_next(request)
+        finally:
+            backend.release(concurrency_key)
@@ -1,3 +1,7 @@
+import os
+import threading
+import time
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -13,6 +17,17 @@ SECRET_KEY = "cooper_crm_lite_secret_key_change_me"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 # 24 hours
 
+# Stateless mode: access tokens carry uid/name claims so get_current_user can skip
+# the users table. Access tokens are short lived and renewed with a refresh token.
+# Refresh tokens rotate on every use, so their lifetime is an idle timeout: a session
+# unused for longer than that must log in again.
+STATELESS_AUTH = os.getenv("CRM_STATELESS_AUTH", "0") == "1"
+STATELESS_ACCESS_TOKEN_EXPIRE_MINUTES = 15
+REFRESH_TOKEN_EXPIRE_MINUTES = 60
+# users.token_generation is cached per process; a bump made by another worker is seen
+# once the cached value expires.
+TOKEN_GENERATION_CACHE_SECONDS = 30
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -22,6 +37,12 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+# In-memory token state. Lives per process, so with several workers each one keeps
+# its own copy; restarting the process clears the deny-list.
+_token_lock = threading.Lock()
+_revoked_tokens = {}  # jti or "sid:<session>" -> expiry (epoch seconds), pruned once expired
+_token_generations = {}  # user_id -> (users.token_generation, cached at monotonic time)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -32,7 +53,93 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+def _cache_token_generation(user_id: int, generation: int):
+    with _token_lock:
+        _token_generations[user_id] = (generation, time.monotonic())
+
+def get_token_generation(db: Session, user_id: int) -> Optional[int]:
+    # None when the user no longer exists
+    cached = _token_generations.get(user_id)
+    if cached is not None and time.monotonic() - cached[1] < TOKEN_GENERATION_CACHE_SECONDS:
+        return cached[0]
+    generation = db.query(models.User.token_generation).filter(models.User.id == user_id).scalar()
+    if generation is None:
+        return None
+    _cache_token_generation(user_id, generation)
+    return generation
+
+def bump_token_generation(db: Session, user: models.User):
+    # Invalidates every token issued so far for this user. Call it from any future
+    # password change or user deletion path, before committing that change.
+    user.token_generation = (user.token_generation or 0) + 1
+    db.commit()
+    _cache_token_generation(user.id, user.token_generation)
+
+def _user_claims(user: models.User, token_type: str, sid: str) -> dict:
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "name": user.name,
+        "gen": user.token_generation or 0,
+        "typ": token_type,
+        "sid": sid,
+        "jti": uuid.uuid4().hex,
+    }
+
+def create_user_tokens(user: models.User, sid: Optional[str] = None) -> dict:
+    if not STATELESS_AUTH:
+        access_token = create_access_token(data={"sub": user.email})
+        return {"access_token": access_token, "token_type": "bearer"}
+
+    # Every token from one login shares a session id, so logout revokes them together
+    sid = sid or uuid.uuid4().hex
+    access_token = create_access_token(
+        data=_user_claims(user, "access", sid),
+        expires_delta=timedelta(minutes=STATELESS_ACCESS_TOKEN_EXPIRE_MINUTES),
+    )
+    refresh_token = create_access_token(
+        data=_user_claims(user, "refresh", sid),
+        expires_delta=timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES),
+    )
+    return {"access_token": access_token, "token_type": "bearer", "refresh_token": refresh_token}
+
+def _prune_revoked(now: float):
+    for key in [k for k, exp in _revoked_tokens.items() if exp < now]:
+        del _revoked_tokens[key]
+
+def revoke_session(payload: dict):
+    # Any token of the session, access or refresh, expires within the refresh window
+    sid = payload.get("sid")
+    if sid is None:
+        return
+    now = time.time()
+    with _token_lock:
+        _prune_revoked(now)
+        _revoked_tokens["sid:" + sid] = now + REFRESH_TOKEN_EXPIRE_MINUTES * 60
+
+def consume_token(payload: dict) -> bool:
+    # Marks a single-use token as spent; False if it was already used
+    jti = payload.get("jti")
+    if jti is None:
+        return False
+    now = time.time()
+    with _token_lock:
+        if jti in _revoked_tokens:
+            return False
+        _prune_revoked(now)
+        _revoked_tokens[jti] = payload.get("exp", now)
+        return True
+
+def is_token_revoked(payload: dict) -> bool:
+    jti = payload.get("jti")
+    sid = payload.get("sid")
+    return (jti is not None and jti in _revoked_tokens) or (
+        sid is not None and "sid:" + sid in _revoked_tokens
+    )
+
+def decode_token(token: str, token_type: str = "access", db: Optional[Session] = None) -> dict:
+    # Without a db session the token generation is not checked (admission control
+    # only needs the subject to pick a rate-limit bucket).
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -40,13 +147,36 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     )
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = schemas.TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    
+    if payload.get("sub") is None:
+        raise credentials_exception
+    # Legacy tokens carry no "typ" and are access tokens
+    if payload.get("typ", "access") != token_type:
+        raise credentials_exception
+    if is_token_revoked(payload):
+        # A spent refresh token presented again has leaked: revoke its whole session
+        if token_type == "refresh":
+            revoke_session(payload)
+        raise credentials_exception
+    uid = payload.get("uid")
+    if uid is not None and db is not None and payload.get("gen", 0) != get_token_generation(db, uid):
+        raise credentials_exception
+    return payload
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    payload = decode_token(token, db=db)
+    token_data = schemas.TokenData(email=payload.get("sub"))
+
+    # Stateless tokens already identify the user: build a detached User, no query
+    if STATELESS_AUTH and payload.get("uid") is not None:
+        return models.User(id=payload["uid"], email=token_data.email, name=payload.get("name"))
+
     user = db.query(models.User).filter(models.User.email == token_data.email).first()
     if user is None:
         raise credentials_exception
@@ -0,0 +1,181 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # snapshot is optional, crud falls back to SQL without it
+    np = None
+
+from sqlalchemy.orm import Session
+
+from . import models
+
+# In-process read model of the opportunity board. Rows live in array-backed columns
+# (interned string codes, float64 values, epoch timestamps) so dashboard aggregates
+# are answered with vectorized NumPy instead of rebuilding ORM rows.
+BOARD_SNAPSHOT_ENABLED = os.getenv("CRM_BOARD_SNAPSHOT", "0") == "1"
+# Writes made by another worker/process are invisible to this snapshot, so it is
+# considered stale (and reloaded) after this many seconds.
+BOARD_SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv("CRM_BOARD_SNAPSHOT_MAX_AGE", "300"))
+
+EPOCH = datetime(1970, 1, 1)
+SECONDS_PER_DAY = 24 * 60 * 60
+_INITIAL_CAPACITY = 256
+
+def to_epoch(value):
+    if value is None:
+        return float("nan")
+    return (value - EPOCH).total_seconds()
+
+class OpportunityBoard:
+    _interned = ("status", "temperatura", "produto")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._loaded_at = None
+        self._stale = True
+        self._writes = 0  # upserts seen, lets load() detect writes racing its SELECT
+        self._reset(0)
+
+    def _reset(self, capacity):
+        self._size = 0
+        self._row_by_id = {}
+        self._codes = {name: {} for name in self._interned}
+        self._labels = {name: [] for name in self._interned}
+        if np is None:
+            return
+        self.id = np.zeros(capacity, dtype=np.int64)
+        self.owner_id = np.zeros(capacity, dtype=np.int64)
+        self.status = np.zeros(capacity, dtype=np.int16)
+        self.temperatura = np.zeros(capacity, dtype=np.int16)
+        self.produto = np.zeros(capacity, dtype=np.int16)
+        self.valor_estimado = np.zeros(capacity, dtype=np.float64)
+        self.created_at = np.zeros(capacity, dtype=np.float64)
+        self.last_interaction_date = np.zeros(capacity, dtype=np.float64)
+
+    @property
+    def enabled(self):
+        return BOARD_SNAPSHOT_ENABLED and np is not None
+
+    def is_fresh(self):
+        if not self.enabled or self._stale or self._loaded_at is None:
+            return False
+        return time.monotonic() - self._loaded_at < BOARD_SNAPSHOT_MAX_AGE_SECONDS
+
+    def mark_stale(self):
+        self._stale = True
+
+    def _intern(self, column, value):
+        # None is stored as -1
+        if value is None:
+            return -1
+        codes = self._codes[column]
+        code = codes.get(value)
+        if code is None:
+            code = len(self._labels[column])
+            codes[value] = code
+            self._labels[column].append(value)
+        return code
+
+    def _grow(self, capacity):
+        for name in ("id", "owner_id", "status", "temperatura", "produto",
+                     "valor_estimado", "created_at", "last_interaction_date"):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def _write_row(self, opportunity):
+        row = self._row_by_id.get(opportunity.id)
+        if row is None:
+            row = self._size
+            if row >= len(self.id):
+                self._grow(max(_INITIAL_CAPACITY, 2 * len(self.id)))
+            self._row_by_id[opportunity.id] = row
+            self._size += 1
+        self.id[row] = opportunity.id
+        self.owner_id[row] = -1 if opportunity.owner_id is None else opportunity.owner_id
+        self.status[row] = self._intern("status", opportunity.status)
+        self.temperatura[row] = self._intern("temperatura", opportunity.temperatura)
+        self.produto[row] = self._intern("produto", opportunity.produto)
+        self.valor_estimado[row] = opportunity.valor_estimado or 0.0
+        self.created_at[row] = to_epoch(opportunity.created_at)
+        self.last_interaction_date[row] = to_epoch(opportunity.last_interaction_date)
+
+    def load(self, db: Session):
+        if not self.enabled:
+            return
+        with self._lock:
+            writes_before = self._writes
+        rows = db.query(
+            models.Opportunity.id,
+            models.Opportunity.owner_id,
+            models.Opportunity.status,
+            models.Opportunity.temperatura,
+            models.Opportunity.produto,
+            models.Opportunity.valor_estimado,
+            models.Opportunity.created_at,
+            models.Opportunity.last_interaction_date,
+        ).all()
+        with self._lock:
+            if self._writes != writes_before:
+                # An upsert landed while the SELECT ran and may be missing from rows;
+                # keep the snapshot stale so readers use SQL until the next reload
+                self._stale = True
+                return
+            self._reset(max(_INITIAL_CAPACITY, len(rows)))
+            for row in rows:
+                self._write_row(row)
+            self._loaded_at = time.monotonic()
+            self._stale = False
+
+    def ensure_fresh(self, db: Session):
+        # Single-flight, non-blocking reload: one request reloads, concurrent readers
+        # see is_fresh() == False and fall back to SQL meanwhile.
+        if self.is_fresh():
+            return
+        if not self._reload_lock.acquire(blocking=False):
+            return
+        try:
+            if not self.is_fresh():
+                self.load(db)
+        finally:
+            self._reload_lock.release()
+
+    def upsert(self, opportunity: models.Opportunity):
+        if not self.enabled:
+            return
+        try:
+            with self._lock:
+                self._writes += 1
+                if self._loaded_at is not None:
+                    self._write_row(opportunity)
+        except Exception:
+            # Never fail a write because of the read model; just force a reload
+            self.mark_stale()
+
+    def _days_since(self, epoch_column, now=None):
+        now = to_epoch(now or datetime.utcnow())
+        return np.floor((now - epoch_column) / SECONDS_PER_DAY)
+
+    def summary(self, at_risk_days: int):
+        with self._lock:
+            n = self._size
+            status = self.status[:n]
+            counts = np.bincount(status[status >= 0], minlength=len(self._labels["status"]))
+            by_status = {
+                label: int(count)
+                for label, count in zip(self._labels["status"], counts)
+                if count
+            }
+            return {
+                "total": n,
+                "total_value": float(self.valor_estimado[:n].sum()),
+                "at_risk": int(np.count_nonzero(self._days_since(self.last_interaction_date[:n]) > at_risk_days)),
+                "by_status": by_status,
+            }
+
+board = OpportunityBoard()
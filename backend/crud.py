@@ -1,8 +1,13 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
 
 from . import models, schemas, auth
+from .board_snapshot import board
+
+CLAIM_AFTER_DAYS = 90 # opportunity is free to claim after this many days without interaction
+AT_RISK_DAYS = 85 # dashboard warning threshold
 
 def create_user(db: Session, user: schemas.UserCreate):
     # Validate domain
@@ -20,11 +25,40 @@ def get_opportunities(db: Session, skip: int = 0, limit: int = 100):
 def get_my_opportunities(db: Session, user_id: int):
     return db.query(models.Opportunity).filter(models.Opportunity.owner_id == user_id).all()
 
+def _use_board(db: Session):
+    # Snapshot answers reads only while fresh; stale reads (reload pending, failed
+    # upsert, or max age reached) use SQL while one request reloads it
+    if not board.enabled:
+        return False
+    board.ensure_fresh(db)
+    return board.is_fresh()
+
+def get_board_summary(db: Session):
+    if _use_board(db):
+        return board.summary(at_risk_days=AT_RISK_DAYS)
+
+    total, total_value = db.query(
+        func.count(models.Opportunity.id), func.coalesce(func.sum(models.Opportunity.valor_estimado), 0.0)
+    ).one()
+    # days > AT_RISK_DAYS  <=>  last interaction at least AT_RISK_DAYS + 1 days ago
+    at_risk_cutoff = datetime.utcnow() - timedelta(days=AT_RISK_DAYS + 1)
+    at_risk = db.query(func.count(models.Opportunity.id)).filter(
+        models.Opportunity.last_interaction_date <= at_risk_cutoff
+    ).scalar()
+    by_status = dict(
+        db.query(models.Opportunity.status, func.count(models.Opportunity.id))
+        .filter(models.Opportunity.status.isnot(None))
+        .group_by(models.Opportunity.status)
+        .all()
+    )
+    return {"total": total, "total_value": float(total_value), "at_risk": at_risk, "by_status": by_status}
+
 def create_opportunity(db: Session, opportunity: schemas.OpportunityCreate, user_id: int):
     db_opportunity = models.Opportunity(**opportunity.dict(), owner_id=user_id)
     db.add(db_opportunity)
     db.commit()
     db.refresh(db_opportunity)
+    board.upsert(db_opportunity)
     return db_opportunity
 
 def update_opportunity(db: Session, opportunity_id: int, opportunity_update: schemas.OpportunityUpdate, user_id: int):
@@ -34,7 +68,7 @@ def update_opportunity(db: Session, opportunity_id: int, opportunity_update: sch
 
     # 90 Days Rule Logic
     days_since_interaction = (datetime.utcnow() - db_opportunity.last_interaction_date).days
-    is_free_to_claim = days_since_interaction > 90
+    is_free_to_claim = days_since_interaction > CLAIM_AFTER_DAYS
     
     if db_opportunity.owner_id != user_id and not is_free_to_claim:
         raise HTTPException(
@@ -56,6 +90,7 @@ def update_opportunity(db: Session, opportunity_id: int, opportunity_update: sch
     
     db.commit()
     db.refresh(db_opportunity)
+    board.upsert(db_opportunity)
     return db_opportunity
 
 def create_interaction(db: Session, interaction: schemas.InteractionCreate, opportunity_id: int, user_id: int):
@@ -66,7 +101,7 @@ def create_interaction(db: Session, interaction: schemas.InteractionCreate, oppo
         raise HTTPException(status_code=404, detail="Opportunity not found")
         
     days_since_interaction = (datetime.utcnow() - db_opportunity.last_interaction_date).days
-    is_free_to_claim = days_since_interaction > 90
+    is_free_to_claim = days_since_interaction > CLAIM_AFTER_DAYS
 
     if db_opportunity.owner_id != user_id and not is_free_to_claim:
         raise HTTPException(status_code=403, detail="Forbidden")
@@ -82,4 +117,5 @@ def create_interaction(db: Session, interaction: schemas.InteractionCreate, oppo
     
     db.commit()
     db.refresh(db_interaction)
+    board.upsert(db_opportunity)
     return db_interaction
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -17,3 +17,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def add_missing_column(table: str, column: str, ddl: str):
+    # create_all() does not alter existing tables, so older cooper.db files get new
+    # columns added here
+    columns = [c["name"] for c in inspect(engine).get_columns(table)]
+    if column not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE %s ADD COLUMN %s %s" % (table, column, ddl)))
@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
@@ -5,11 +6,23 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from . import models, schemas, crud, database, auth
+from .admission import ADMISSION_CONTROL_ENABLED, DEFAULT_LIMITS, AdmissionControl, AdmissionControlMiddleware
 from .database import engine
+from .board_snapshot import board
 
 models.Base.metadata.create_all(bind=engine)
+database.add_missing_column("users", "token_generation", "INTEGER NOT NULL DEFAULT 0")
 
-app = FastAPI(title="Cooper CRM Lite")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    db = database.SessionLocal()
+    try:
+        board.load(db)
+    finally:
+        db.close()
+    yield
+
+app = FastAPI(title="Cooper CRM Lite", lifespan=lifespan)
 
 # CORS
 origins = [
@@ -19,12 +32,18 @@ origins = [
     "http://localhost:5175",
 ]
 
+# Limiter state and metrics live here, not in the middleware, which Starlette may build more than once.
+# Added before CORS so that 429 responses still carry CORS headers.
+admission = AdmissionControl(limits=DEFAULT_LIMITS if ADMISSION_CONTROL_ENABLED else {})
+app.add_middleware(AdmissionControlMiddleware, control=admission)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],  # lets the browser client honour 429 back-off
 )
 @app.post("/token", response_model=schemas.Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(database.get_db)):
@@ -35,8 +54,37 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token = auth.create_access_token(data={"sub": user.email})
-    return {"access_token": access_token, "token_type": "bearer"}
+    return auth.create_user_tokens(user)
+
+@app.post("/token/refresh", response_model=schemas.Token)
+def refresh_access_token(body: schemas.TokenRefresh, db: Session = Depends(database.get_db)):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    payload = auth.decode_token(body.refresh_token, token_type="refresh", db=db)
+    # Refresh tokens are single use; losing a concurrent race for the same token is
+    # treated like reuse (see decode_token) and revokes the session
+    if not auth.consume_token(payload):
+        auth.revoke_session(payload)
+        raise credentials_exception
+    user = auth.get_user_by_email(db, payload["sub"])
+    if user is None or user.id != payload.get("uid"):
+        raise credentials_exception
+    return auth.create_user_tokens(user, sid=payload.get("sid"))
+
+@app.post("/token/revoke", status_code=status.HTTP_204_NO_CONTENT)
+def revoke_access_token(token: str = Depends(auth.oauth2_scheme), db: Session = Depends(database.get_db)):
+    # Revokes the whole login session, including its refresh token
+    payload = auth.decode_token(token, db=db)
+    if payload.get("sid") is None:
+        # Default-mode tokens carry no session id and stay valid until they expire
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Token revocation requires CRM_STATELESS_AUTH=1; discard the token to log out.",
+        )
+    auth.revoke_session(payload)
 
 @app.post("/users/", response_model=schemas.User)
 def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)):
@@ -49,11 +97,19 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(database.get_db)
 async def read_users_me(current_user: models.User = Depends(auth.get_current_user)):
     return current_user
 
+@app.get("/metrics/admission", response_model=List[schemas.AdmissionRouteMetrics])
+def read_admission_metrics(current_user: models.User = Depends(auth.get_current_user)):
+    return admission.metrics()
+
 # Opportunity Routes
 @app.get("/opportunities/", response_model=List[schemas.Opportunity])
 def read_opportunities(skip: int = 0, limit: int = 100, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     return crud.get_opportunities(db, skip=skip, limit=limit)
 
+@app.get("/opportunities/summary", response_model=schemas.OpportunitySummary)
+def read_opportunities_summary(db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
+    return crud.get_board_summary(db)
+
 @app.post("/opportunities/", response_model=schemas.Opportunity)
 def create_opportunity(opportunity: schemas.OpportunityCreate, db: Session = Depends(database.get_db), current_user: models.User = Depends(auth.get_current_user)):
     return crud.create_opportunity(db=db, opportunity=opportunity, user_id=current_user.id)
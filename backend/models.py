@@ -43,6 +43,8 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     password_hash = Column(String)
     name = Column(String)
+    # Bumped on password change/deletion to invalidate stateless tokens (see auth.py)
+    token_generation = Column(Integer, default=0, nullable=False, server_default="0")
 
     opportunities = relationship("Opportunity", back_populates="owner")
 
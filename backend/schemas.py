@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from enum import Enum
 
@@ -82,10 +82,32 @@ class Opportunity(OpportunityBase):
     class Config:
         from_attributes = True
 
+class OpportunitySummary(BaseModel):
+    total: int
+    total_value: float
+    at_risk: int
+    by_status: Dict[str, int]
+
 # Auth
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+class TokenRefresh(BaseModel):
+    refresh_token: str
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+
+# Admission control
+class AdmissionRouteMetrics(BaseModel):
+    method: str
+    path: str
+    rate_per_minute: float
+    burst: int
+    max_concurrent: int
+    in_flight: int
+    admitted: int
+    shed_rate: int
+    shed_concurrency: int
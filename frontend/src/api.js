@@ -15,6 +15,68 @@ api.interceptors.request.use((config) => {
   return config;
 });
 
+// With stateless auth the backend issues short-lived access tokens plus a
+// single-use refresh token. On a 401, trade the refresh token for a new pair
+// once and retry; concurrent 401s share the same refresh request.
+let refreshRequest = null;
+
+const refreshTokens = async () => {
+  const refreshToken = localStorage.getItem('refresh_token');
+  if (!refreshToken) {
+    throw new Error('No refresh token');
+  }
+  const response = await axios.post(`${API_BASE_URL}/token/refresh`, { refresh_token: refreshToken });
+  storeTokens(response.data);
+  return response.data.access_token;
+};
+
+api.interceptors.response.use(
+  (response) => response,
+  async (error) => {
+    const original = error.config;
+    if (error.response?.status === 429) {
+      // Admission control shed the request; retry a read once after the server's
+      // back-off, otherwise surface it (error.retryAfter is in seconds)
+      error.retryAfter = Number(error.response.headers['retry-after']) || 1;
+      if (original.method === 'get' && !original._retried429 && error.retryAfter <= 10) {
+        original._retried429 = true;
+        await new Promise((resolve) => setTimeout(resolve, error.retryAfter * 1000));
+        return api(original);
+      }
+      return Promise.reject(error);
+    }
+    if (error.response?.status !== 401 || original._retried || !localStorage.getItem('refresh_token')) {
+      return Promise.reject(error);
+    }
+    original._retried = true;
+    try {
+      refreshRequest = refreshRequest || refreshTokens();
+      const token = await refreshRequest;
+      original.headers.Authorization = `Bearer ${token}`;
+      return api(original);
+    } catch {
+      clearTokens();
+      return Promise.reject(error);
+    } finally {
+      refreshRequest = null;
+    }
+  }
+);
+
+export const storeTokens = (data) => {
+  localStorage.setItem('token', data.access_token);
+  if (data.refresh_token) {
+    localStorage.setItem('refresh_token', data.refresh_token);
+  } else {
+    localStorage.removeItem('refresh_token');
+  }
+};
+
+export const clearTokens = () => {
+  localStorage.removeItem('token');
+  localStorage.removeItem('refresh_token');
+};
+
 export const auth = {
   login: async (email, password) => {
     const formData = new FormData();
@@ -31,6 +93,19 @@ export const auth = {
     const response = await api.get('/users/me/');
     return response.data;
   },
+  logout: async () => {
+    try {
+      // Only stateless-auth sessions (those with a refresh token) can be revoked
+      // server-side; in the default mode logging out just discards the token.
+      if (localStorage.getItem('refresh_token')) {
+        await api.post('/token/revoke');
+      }
+    } catch {
+      // Logging out locally is enough if the server call fails
+    } finally {
+      clearTokens();
+    }
+  },
 };
 
 export const opportunities = {
@@ -38,6 +113,10 @@ export const opportunities = {
     const response = await api.get('/opportunities/');
     return response.data;
   },
+  getSummary: async () => {
+    const response = await api.get('/opportunities/summary');
+    return response.data;
+  },
   create: async (data) => {
     const response = await api.post('/opportunities/', data);
     return response.data;
@@ -1,22 +1,22 @@
 import { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { opportunities } from '../api';
+import { auth, opportunities } from '../api';
 import { TrendingUp, AlertCircle, DollarSign, Menu } from 'lucide-react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer } from 'recharts';
 
 export default function Dashboard() {
-  const [opps, setOpps] = useState([]);
+  const [summary, setSummary] = useState({ total: 0, total_value: 0, at_risk: 0, by_status: {} });
   const [loading, setLoading] = useState(true);
   const navigate = useNavigate();
 
   useEffect(() => {
-    loadOpportunities();
+    loadSummary();
   }, []);
 
-  const loadOpportunities = async () => {
+  const loadSummary = async () => {
     try {
-      const data = await opportunities.getAll();
-      setOpps(data);
+      const data = await opportunities.getSummary();
+      setSummary(data);
     } catch (error) {
       console.error(error);
       if (error.response?.status === 401) {
@@ -27,22 +27,13 @@ export default function Dashboard() {
     }
   };
 
-  const totalOpps = opps.length;
-  const totalValue = opps.reduce((sum, opp) => sum + (opp.valor_estimado || 0), 0);
-  
-  // Calculate days since last interaction
-  const oppsAtRisk = opps.filter(opp => {
-    const lastInteraction = new Date(opp.last_interaction_date);
-    const daysSince = Math.floor((new Date() - lastInteraction) / (1000 * 60 * 60 * 24));
-    return daysSince > 85;
-  }).length;
+  // Totals, risk (>85 days without interaction) and status counts are aggregated by the backend
+  const totalOpps = summary.total;
+  const totalValue = summary.total_value;
+  const oppsAtRisk = summary.at_risk;
 
   // Chart data
-  const statusCounts = {};
-  opps.forEach(opp => {
-    statusCounts[opp.status] = (statusCounts[opp.status] || 0) + 1;
-  });
-  const chartData = Object.entries(statusCounts).map(([name, value]) => ({
+  const chartData = Object.entries(summary.by_status).map(([name, value]) => ({
     name,
     value
   }));
@@ -69,8 +60,8 @@ export default function Dashboard() {
               Kanban
             </button>
             <button
-              onClick={() => {
-                localStorage.removeItem('token');
+              onClick={async () => {
+                await auth.logout();
                 navigate('/');
               }}
               className="px-4 py-2 bg-red-600 text-white rounded-lg hover:bg-red-700"
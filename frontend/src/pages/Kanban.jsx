@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { opportunities } from '../api';
+import { auth, opportunities } from '../api';
 import { Flame, Droplet, WindIcon, Thermometer } from 'lucide-react';
 
 const STATUS_COLUMNS = ['Qualificação', 'Prospecção', 'Proposta', 'Negociação'];
@@ -73,8 +73,8 @@ export default function Kanban() {
               Kanban
             </button>
             <button
-              onClick={() => {
-                localStorage.removeItem('token');
+              onClick={async () => {
+                await auth.logout();
                 navigate('/');
               }}
               className="px-4 py-2 bg-red-600 text-white rounded-lg hover:bg-red-700"
@@ -1,6 +1,6 @@
 import { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
-import { auth } from '../api';
+import { auth, storeTokens } from '../api';
 
 export default function Login() {
   const [email, setEmail] = useState('');
@@ -21,7 +21,7 @@ export default function Login() {
         setIsSignup(false);
       } else {
         const data = await auth.login(email, password);
-        localStorage.setItem('token', data.access_token);
+        storeTokens(data);
         navigate('/dashboard');
       }
     } catch (err) {